@@ -2,8 +2,21 @@
 Basic Stepper Class for Pi Pico using the DVR8825 Motor Driver.
 '''
 
-from machine import Pin  # type: ignore
+from array import array
+import gc
+from math import sqrt
+from machine import Pin, Timer, disable_irq, enable_irq, mem32  # type: ignore
+import micropython  # type: ignore
+from micropython import const  # type: ignore
 import utime  # type: ignore
+import _thread  # type: ignore
+
+try:
+    import rp2  # type: ignore
+    HAS_PIO = True  # PIO state machines available, PIOStepper can be used
+except ImportError:
+    rp2 = None
+    HAS_PIO = False
 
 # Default direction values for the DVR8825
 dvr_CCW = 0  # Counter-Clockwise direction
@@ -14,17 +27,662 @@ dvr_CW = 1  # Clockwise direction.
 HIGH = 1  # high value for Pins.
 LOW = 0  # low value for Pins.
 
+# RP2040 SIO registers, writing a pin mask sets/clears/toggles those GPIOs in a single store.
+SIO_BASE = 0xd0000000
+SIO_GPIO_IN = SIO_BASE + 0x04
+SIO_GPIO_OUT_SET = SIO_BASE + 0x14
+SIO_GPIO_OUT_CLR = SIO_BASE + 0x18
+SIO_GPIO_OUT_XOR = SIO_BASE + 0x1c
+
+# RP2040 raw lower 32 bits of the 1 MHz timer.
+TIMER_TIMERAWL = 0x40054028
+
+STEP_PULSE_US = const(2)  # step pulse high time in microseconds, DVR8825 minimum is 1.9 us
+DIR_SETUP_US = const(1)  # wait between a DIR change and the next STEP edge, DVR8825 minimum is 650 ns
+SPIN_LIMIT_US = const(1000)  # delays above this sleep instead of spinning
+SPIN_TAIL_US = const(50)  # end of a sleeping delay that is still busy-waited, covers the sleep wake-up latency
+MAX_RAMP_STEPS = const(2000)  # maximum length of the acceleration delay table
+CORE1_RETRY_MS = const(100)  # time allowed for the previous core1 thread to exit after it released core1
+
+# Layout of Stepper._state, the per motor values read by the viper pulse loops.
+STATE_POS = const(0)  # position in microsteps
+STATE_TGT = const(1)  # target position in microsteps
+STATE_MASK = const(2)  # GPIO bit mask of the step pin
+STATE_LIMIT = const(3)  # GPIO bit mask of the limit switches checked by the running move, 0 for none
+STATE_HIT = const(4)  # set by the limit switch interrupt, latches edges shorter than a step
+STATE_LEN = const(5)
+
+# PIO step program, clocked at 1 MHz so one cycle is one microsecond.
+PIO_FREQ = 1_000_000
+PIO_LOW_OVERHEAD = const(3)  # cycles of the low phase spent outside the delay loop
+
+# RP2040 PIO TX FIFO addresses and DMA request numbers, for feeding the state machines by DMA.
+PIO0_TXF0 = 0x50200010
+PIO1_TXF0 = 0x50300010
+DREQ_PIO0_TX0 = const(0)
+DREQ_PIO1_TX0 = const(8)
+
+
+def _step_prog():  # type: ignore
+    '''
+    PIO program consuming (count, delay) word pairs from the TX FIFO, emitting count
+    step pulses of STEP_PULSE_US high and (delay + PIO_LOW_OVERHEAD) cycles low.
+    A pair with count 0 is a fence: a word is pushed to the RX FIFO once every
+    pulse queued before it has been sent.
+
+    The step pin is driven by side-set, so both edges come for free with
+    instructions the loop executes anyway.
+    '''
+    wrap_target()
+    label('top')
+    pull(block)
+    mov(x, osr)
+    pull(block)
+    jmp(x_dec, 'step')
+    push(block)
+    jmp('top')
+    label('step')
+    nop().side(1)[1]
+    mov(y, osr).side(0)
+    label('wait')
+    jmp(y_dec, 'wait')
+    jmp(x_dec, 'step')
+    wrap()
+
+
+if HAS_PIO:
+    _step_prog = rp2.asm_pio(sideset_init=rp2.PIO.OUT_LOW)(_step_prog)
+
+
+@micropython.viper
+def _udelay(us: int):
+    '''
+    Busy-waits us microseconds on the 1 MHz timer, returns at once if us <= 0.
+    TIMERAWL is a full 32 bit counter, so the 32 bit subtraction keeps the
+    comparison valid across timer rollover. This does not hold for
+    utime.ticks_us() values, which wrap at a smaller period: those must only
+    be compared with utime.ticks_diff().
+    '''
+    timer = ptr32(TIMER_TIMERAWL)
+    t = int(timer[0])
+    while int(timer[0]) - t < us:
+        pass
+
+
+def _delay_us(us: int) -> None:
+    '''
+    Waits us microseconds. Long delays sleep up to SPIN_TAIL_US before the end
+    and busy-wait the rest, short delays only busy-wait.
+    '''
+    if us > SPIN_LIMIT_US:
+        start = utime.ticks_us()  # ticks_us() value, only compared via ticks_diff()
+        utime.sleep_us(us - SPIN_TAIL_US)
+        us -= utime.ticks_diff(utime.ticks_us(), start)  # absorbs the sleep overshoot
+    _udelay(us)
+
+
+# held by the thread running on core1, from before it is started until its move is done
+_core1_lock = _thread.allocate_lock()
+
+
+def _start_core1(func, args) -> None:
+    '''
+    Function to run func(*args) on core1, waiting for the running core1 move (of any motor) first.
+        - func must release _core1_lock when it is done.
+        - The previous thread releases the lock just before it exits, so starting
+          the thread is retried for up to CORE1_RETRY_MS while core1 is still in use.
+
+    Raises:
+        OSError: if core1 does not become free, _core1_lock is then released.
+    '''
+    _core1_lock.acquire()
+    try:
+        for _ in range(CORE1_RETRY_MS):
+            try:
+                _thread.start_new_thread(func, args)
+                return
+            except OSError:
+                utime.sleep_ms(1)
+        raise OSError('core1 in use')
+    except BaseException:
+        _core1_lock.release()
+        raise
+
+
+@micropython.viper
+def _pulse_n(n: int, delay_q16: int, state: ptr32) -> int:
+    '''
+    Emits n step pulses by writing the step pin mask twice to the SIO toggle register,
+    timing both phases with a busy-wait on the 1 MHz timer.
+    The step pin must be low on entry. Stops early, before the next pulse,
+    once a limit switch reads HIGH or its interrupt has fired.
+
+    Edges are scheduled on absolute deadlines (t += phase) rather than restarting
+    the wait after each store, so the loop overhead does not add to the period.
+    The fraction of the delay is accumulated and adds 1 us to the steps where it
+    carries over, so the average rate matches a non integer delay.
+
+    Parameters:
+        n (int): number of pulses.
+        delay_q16 (int): low time between pulses in microseconds, 16.16 fixed point.
+        state (ptr32): Stepper state (see STATE_*), gives the step pin and limit switch masks.
+
+    Returns:
+        int: number of pulses emitted.
+    '''
+    xor_reg = ptr32(SIO_GPIO_OUT_XOR)
+    in_reg = ptr32(SIO_GPIO_IN)
+    timer = ptr32(TIMER_TIMERAWL)
+    mask = int(state[STATE_MASK])
+    limit_mask = int(state[STATE_LIMIT])
+    delay_us = delay_q16 >> 16
+    frac_step = delay_q16 & 0xffff
+    frac = 0
+    t = int(timer[0])
+    i = 0
+    while i < n:
+        if (int(in_reg[0]) & limit_mask) | int(state[STATE_HIT]):
+            break
+        xor_reg[0] = mask
+        t += STEP_PULSE_US
+        while int(timer[0]) - t < 0:
+            pass
+        xor_reg[0] = mask
+        t += delay_us
+        frac += frac_step
+        if frac > 0xffff:
+            frac -= 0x10000
+            t += 1
+        while int(timer[0]) - t < 0:
+            pass
+        i += 1
+    return i
+
+
+@micropython.viper
+def _pulse_table(delays: ptr32, n: int, state: ptr32) -> int:
+    '''
+    Same as _pulse_n, but the low time of pulse i is read from delays[i].
+
+    Returns:
+        int: number of pulses emitted.
+    '''
+    xor_reg = ptr32(SIO_GPIO_OUT_XOR)
+    in_reg = ptr32(SIO_GPIO_IN)
+    timer = ptr32(TIMER_TIMERAWL)
+    mask = int(state[STATE_MASK])
+    limit_mask = int(state[STATE_LIMIT])
+    t = int(timer[0])
+    i = 0
+    while i < n:
+        if (int(in_reg[0]) & limit_mask) | int(state[STATE_HIT]):
+            break
+        xor_reg[0] = mask
+        t += STEP_PULSE_US
+        while int(timer[0]) - t < 0:
+            pass
+        xor_reg[0] = mask
+        t += delays[i]
+        while int(timer[0]) - t < 0:
+            pass
+        i += 1
+    return i
+
+
+@micropython.viper
+def _step_all(states: ptr32, n_motors: int, delay_us: int) -> int:
+    '''
+    Steps n_motors motors towards their targets at the same time, each tick toggling
+    the step pins of every motor not yet at its target with a single store.
+    Stops all motors, before the next tick, once a limit switch of any motor reads HIGH
+    or its interrupt has latched STATE_HIT.
+
+    Parameters:
+        states (ptr32): n_motors Stepper states (STATE_LEN words each) laid out back to back,
+                    the positions are updated in place.
+        n_motors (int): number of motors.
+        delay_us (int): low time between ticks in microseconds.
+
+    Returns:
+        int: number of ticks emitted.
+    '''
+    xor_reg = ptr32(SIO_GPIO_OUT_XOR)
+    in_reg = ptr32(SIO_GPIO_IN)
+    timer = ptr32(TIMER_TIMERAWL)
+    t = int(timer[0])
+    ticks = 0
+    while True:
+        inputs = int(in_reg[0])
+        hit = 0
+        i = 0
+        while i < n_motors:
+            state = i * STATE_LEN
+            hit |= (inputs & int(states[state + STATE_LIMIT])) | int(states[state + STATE_HIT])
+            i += 1
+        if hit:
+            break
+
+        mask = 0
+        i = 0
+        while i < n_motors:
+            state = i * STATE_LEN
+            pos = int(states[state + STATE_POS])
+            tgt = int(states[state + STATE_TGT])
+            if pos < tgt:
+                states[state + STATE_POS] = pos + 1
+                mask |= states[state + STATE_MASK]
+            elif pos > tgt:
+                states[state + STATE_POS] = pos - 1
+                mask |= states[state + STATE_MASK]
+            i += 1
+        if mask == 0:
+            break
+        xor_reg[0] = mask
+        t += STEP_PULSE_US
+        while int(timer[0]) - t < 0:
+            pass
+        xor_reg[0] = mask
+        t += delay_us
+        while int(timer[0]) - t < 0:
+            pass
+        ticks += 1
+    return ticks
+
+
+@micropython.native
+def check_limit_switches(pins=()) -> bool:
+    '''
+    Function to check if any limit switches have been triggered.
+        - Stops polling at the first triggered switch, allocates no list or generator.
+        - The pins are not validated, for polling the same pins repeatedly
+          use LimitGroup.triggered instead, validated once when the group is built.
+
+    Parameters:
+        pins (list[Pin]): limit switch pins. If no pins are provided, always returns False.
+
+    Returns:
+        bool: True if any switch is HIGH, False if all are LOW.
+    '''
+    for pin in pins:
+        if pin.value():
+            return True
+    return False
+
+
+def _pin_id(pin) -> int:
+    '''
+    Function to get the GPIO number of a pin given as a number or a Pin object.
+        - The rp2 Pin has no id() method, the number is read from its repr,
+          e.g. 'Pin(GPIO14, mode=IN)' or 'Pin(14, mode=IN)'.
+
+    Raises:
+        ValueError: if the repr has no GPIO number, e.g. a pin named 'EXT_GPIO0'.
+    '''
+    if isinstance(pin, int):
+        return pin
+    name = str(pin)[4:].split(',')[0].split(')')[0]
+    if name.startswith('GPIO'):
+        name = name[4:]
+    try:
+        return int(name)
+    except ValueError:
+        raise ValueError('cannot get the GPIO number of {}, pass the GPIO number instead'.format(pin))
+
+
+class LimitGroup:
+    '''
+    Group of limit switch pins, validated once when the group is built.
+
+    The GPIO numbers of the pins are folded into one bit mask, so triggered()
+    is a single read of the SIO input register instead of a value() call per
+    pin, cheap enough to poll from a move loop or pass around as a callback.
+    '''
+
+    def __init__(self, pins) -> None:
+        '''
+        Parameters:
+            pins (iterable[Pin | int]): limit switch pins, as Pin objects or GPIO numbers,
+                    e.g. a list, a tuple or a bytearray of GPIO numbers.
+                    GPIO numbers are configured as inputs.
+        '''
+        try:
+            pins = tuple(pins)
+        except TypeError:
+            raise TypeError('pins must be an iterable of machine.Pin objects or GPIO numbers')
+        self.pins = tuple(Pin(pin, Pin.IN) if isinstance(pin, int) else pin for pin in pins)
+        self._mask = 0
+        for pin in pins:
+            self._mask |= 1 << _pin_id(pin)
+
+    @micropython.native
+    def triggered(self) -> bool:
+        '''
+        Function to check if any limit switch of the group is HIGH.
+        '''
+        return (mem32[SIO_GPIO_IN] & self._mask) != 0
+
+
+# motors latched by the interrupt of each limit switch GPIO, a pin can limit several motors
+_limit_steppers = {}
+
+
+def _limit_irq(steppers):
+    '''
+    Function to make the interrupt handler of a limit switch GPIO, latching every motor in steppers.
+    '''
+    def handler(pin):
+        for stepper in steppers:
+            stepper._limit_isr(pin)
+    return handler
+
+
+def _register_limits(stepper) -> None:
+    '''
+    Function to add a motor to the interrupt handlers of its limit switch GPIOs.
+        - The handler of a GPIO is installed once, by the first motor using it, and then
+          shared, so motors sharing a limit or e-stop pin all get the latch.
+        - The handler replaces any interrupt handler set on the pin outside this module.
+    '''
+    for pin in stepper.limits.pins:
+        pin_id = _pin_id(pin)
+        steppers = _limit_steppers.get(pin_id)
+        if steppers is None:
+            steppers = _limit_steppers[pin_id] = []
+            pin.irq(trigger=Pin.IRQ_RISING, handler=_limit_irq(steppers), hard=True)
+        steppers.append(stepper)
+
+
+def _unregister_limits(stepper) -> None:
+    '''
+    Function to remove a motor from the interrupt handlers of its limit switch GPIOs,
+    the handler of a GPIO is removed once no motor uses it.
+    '''
+    for pin in stepper.limits.pins:
+        pin_id = _pin_id(pin)
+        steppers = _limit_steppers.get(pin_id)
+        if steppers is not None and stepper in steppers:
+            steppers.remove(stepper)
+            if not steppers:
+                pin.irq(handler=None)
+                del _limit_steppers[pin_id]
+
+
+def _set_directions(steppers) -> None:
+    '''
+    Function to set the direction of several motors towards their targets,
+    writing all the direction pins with one SIO set and one SIO clear store.
+    '''
+    set_mask = clr_mask = 0
+    for stepper in steppers:
+        distance = stepper.steps_to_target()
+        if distance:
+            value = stepper._dir_update(stepper.CW if distance > 0 else stepper.CCW)
+            if value > 0:
+                set_mask |= stepper._dir_mask
+            elif value == 0:
+                clr_mask |= stepper._dir_mask
+    mem32[SIO_GPIO_OUT_SET] = set_mask
+    mem32[SIO_GPIO_OUT_CLR] = clr_mask
+
+
+def _hold_moves(steppers) -> list:
+    '''
+    Function to take the move lock of every motor of a multi-axis move, see Stepper._hold_move().
+
+    Returns:
+        list[bool]: for each motor, True if its lock was taken.
+    '''
+    return [stepper._hold_move() for stepper in steppers]
+
+
+def _release_moves(steppers, held) -> None:
+    '''
+    Function to release the move locks taken by _hold_moves().
+    '''
+    for stepper, locked in zip(steppers, held):
+        if locked:
+            stepper._move_lock.release()
+
+
+def _limit_stop_all(steppers) -> None:
+    '''
+    Function to start the limit debounce window of every motor of a multi-axis move
+    if the move was stopped short by a limit switch.
+    '''
+    for stepper in steppers:
+        if stepper.position != stepper._target_micro:
+            for other in steppers:
+                other._limit_stop()
+            return
+
+
+def move_together(steppers, targets) -> None:
+    '''
+    Move several motors to absolute target positions at the same time.
+        - Every motor steps at the cruise speed of the slowest one, motors with
+          shorter moves stop once they reach their target.
+        - The acceleration profiles are not used.
+        - A limit switch of any motor stops all of them.
+        - Waits for the running async or timer moves of the motors first.
+        - Only for Stepper instances, a PIOStepper step pin is driven by its state machine.
+
+    Parameters:
+        steppers (list[Stepper]): motors to move.
+        targets (list[int]): target position in steps of each motor.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: if there is not one target per motor.
+    '''
+    if len(targets) != len(steppers):
+        raise ValueError('expected {} targets, got {}'.format(len(steppers), len(targets)))
+    for stepper in steppers:
+        stepper._check_speed()
+    held = _hold_moves(steppers)
+    try:
+        n_motors = len(steppers)
+        states = array('i', [0] * (n_motors * STATE_LEN))
+        delay_us = 0
+        for i, (stepper, target_pos) in enumerate(zip(steppers, targets)):
+            stepper.set_target_pos(target_pos)
+            stepper._arm_limits()
+            states[i * STATE_LEN:(i + 1) * STATE_LEN] = stepper._state
+            stepper._set_latch(states, i * STATE_LEN + STATE_HIT)
+            delay_us = max(delay_us, stepper._cruise_us)
+
+        _set_directions(steppers)
+        _udelay(DIR_SETUP_US)
+        try:
+            _step_all(states, n_motors, delay_us)
+        finally:
+            for i, stepper in enumerate(steppers):
+                stepper._set_latch(stepper._state, STATE_HIT)
+                stepper.position = states[i * STATE_LEN + STATE_POS]
+        _limit_stop_all(steppers)
+    finally:
+        _release_moves(steppers, held)
+
+
+@micropython.viper
+def _run_bank(masks: ptr32, intervals: ptr32, next_times: ptr32, remaining: ptr32) -> int:
+    '''
+    Steps a bank of motors, each with its own step period, until all are done.
+    Each tick waits for the earliest due motor, then toggles the step pins of
+    every motor due at that time with a single store.
+    Stops all motors, before the next tick, once a limit switch reads HIGH or the latch is set.
+
+    Parameters:
+        masks (ptr32): GPIO bit mask of each motor, terminated by a 0 entry,
+                    followed by the limit switch mask of the bank and the limit latch.
+        intervals (ptr32): step period of each motor in microseconds.
+        next_times (ptr32): scratch buffer for the next step time of each motor.
+        remaining (ptr32): steps left for each motor, counted down in place.
+
+    Returns:
+        int: number of ticks emitted.
+    '''
+    xor_reg = ptr32(SIO_GPIO_OUT_XOR)
+    in_reg = ptr32(SIO_GPIO_IN)
+    timer = ptr32(TIMER_TIMERAWL)
+    now = int(timer[0])
+    i = 0
+    while masks[i]:
+        next_times[i] = now
+        i += 1
+    limit_mask = int(masks[i + 1])
+    latch = i + 2
+
+    ticks = 0
+    while True:
+        # earliest due motor
+        first = -1
+        t = 0
+        i = 0
+        while masks[i]:
+            if int(remaining[i]) > 0 and (first < 0 or int(next_times[i]) - t < 0):
+                first = i
+                t = int(next_times[i])
+            i += 1
+        if first < 0:
+            break
+        while int(timer[0]) - t < 0:
+            pass
+        if (int(in_reg[0]) & limit_mask) | int(masks[latch]):
+            break
+
+        mask = 0
+        i = 0
+        while masks[i]:
+            if int(remaining[i]) > 0 and int(next_times[i]) - t <= 0:
+                mask |= masks[i]
+                next_times[i] = int(next_times[i]) + int(intervals[i])
+                remaining[i] = int(remaining[i]) - 1
+            i += 1
+        xor_reg[0] = mask
+        now = int(timer[0])
+        while int(timer[0]) - now < STEP_PULSE_US:
+            pass
+        xor_reg[0] = mask
+        ticks += 1
+    return ticks
+
+
+class StepperBank:
+    '''
+    Group of motors moved together by a single viper kernel, each at its own step rate.
+
+    The per motor values are kept as one array per field (struct of arrays),
+    so each tick the kernel pulses every due motor with a single GPIO store.
+    A limit switch of any motor stops all of them, and a bank move waits for the
+    running async or timer moves of its motors first.
+    Only for Stepper instances, a PIOStepper step pin is driven by its state machine.
+    '''
+
+    def __init__(self, steppers) -> None:
+        '''
+        Parameters:
+            steppers (list[Stepper]): motors of the bank.
+        '''
+        self.steppers = tuple(steppers)
+        n_motors = len(self.steppers)
+        # step pin masks, 0 terminator, limit switch mask of the bank, limit latch
+        self._masks = array('I', [stepper._mask for stepper in self.steppers] + [0, 0, 0])
+        self._intervals = array('I', [0] * n_motors)
+        self._next_times = array('I', [0] * n_motors)
+        self._remaining = array('i', [0] * n_motors)
+
+    def move_to_abs(self, targets, duration_us: int | None = None) -> None:
+        '''
+        Move every motor of the bank to its absolute target position at the same time.
+        - The garbage collector is run before and disabled during the move, as in Stepper._move().
+
+        Parameters:
+            targets (list[int]): target position in steps of each motor.
+            duration_us (int | None): Optional duration of the move in microseconds.
+                    - None: every motor steps at its own cruise speed.
+                    - int: the step periods are stretched so every motor arrives at the same
+                      time (linear interpolation), but never faster than its cruise speed.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: if there is not one target per motor.
+        '''
+        if len(targets) != len(self.steppers):
+            raise ValueError('expected {} targets, got {}'.format(len(self.steppers), len(targets)))
+        for stepper in self.steppers:
+            stepper._check_speed()
+        held = _hold_moves(self.steppers)
+        try:
+            distances = []
+            for i in range(len(self._remaining)):
+                self._remaining[i] = 0  # no steps left over from the previous move
+            for i, (stepper, target_pos) in enumerate(zip(self.steppers, targets)):
+                stepper.set_target_pos(target_pos)
+                distance = stepper.steps_to_target()
+                distances.append(distance)
+
+                interval_us = stepper._cruise_us + STEP_PULSE_US
+                if duration_us is not None and distance:
+                    interval_us = max(interval_us, duration_us // abs(distance))
+                self._intervals[i] = interval_us
+                self._remaining[i] = abs(distance)
+
+            n_motors = len(self.steppers)
+            limit_mask = 0
+            for stepper in self.steppers:
+                limit_mask |= stepper._arm_limits()
+                stepper._set_latch(self._masks, n_motors + 2)
+            self._masks[n_motors + 1] = limit_mask
+            self._masks[n_motors + 2] = 0
+
+            _set_directions(self.steppers)
+            gc_enabled = gc.isenabled()
+            if gc_enabled:
+                gc.collect()
+                gc.disable()
+            _udelay(DIR_SETUP_US)
+            try:
+                _run_bank(self._masks, self._intervals, self._next_times, self._remaining)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+                for stepper, distance, remaining in zip(self.steppers, distances, self._remaining):
+                    stepper._set_latch(stepper._state, STATE_HIT)
+                    done = abs(distance) - remaining
+                    stepper.position += stepper._step_delta * done
+            _limit_stop_all(self.steppers)
+        finally:
+            _release_moves(self.steppers, held)
+
 
 class Stepper:
 
-    def __init__(self, step_pin: int, dir_pin: int, enable_pin: int, step_mode=1, **kwargs) -> None:
+    # (M0, M1, M2) pin values indexed by step mode, None for unsupported modes.
+    _MODE_BITS = ((None,
+                   (0, 0, 0),    # Full step
+                   (1, 0, 0),    # Half step
+                   None,
+                   (0, 1, 0),    # Quarter step
+                   None, None, None,
+                   (1, 1, 0))    # 1/8 step
+                  + (None,) * 7
+                  + ((0, 0, 1),)  # 1/16 step
+                  + (None,) * 15
+                  + ((1, 0, 1),))  # 1/32 step
+
+    def __init__(self, step_pin: int, dir_pin: int, enable_pin: int | None, step_mode=1, **kwargs) -> None:
         """
         Initializes the stepper motor controller instance.
 
         Parameters:
             step_pin (int): Pin number for step signal.
             dir_pin (int): Pin number for direction signal.
-            enable_pin (int): Pin number for enable signal.
+            enable_pin (int | None): Pin number for enable signal.
+                        None if the enable input is hardwired, enable() and disable() then only track the state.
             step_mode (int): Optional parameter specifying the step mode.
                         Default is 1 (full step).
                         Supported values:
@@ -38,16 +696,80 @@ class Stepper:
             **kwargs:
                 mode_pins (tuple[int | none]): Tuple containing 3 pin numbers (m0, m1, m2) for setting step mode.
                                     These pins can alternatively be hardwired to 3.3V to free up more GPIO pins on the Pico.
+                limit_pins (iterable[Pin | int]): limit switch pins, see LimitGroup.
+                                    A move stops before the next step once any of them reads HIGH
+                                    or had a rising edge, caught by a hard interrupt on each pin.
+                                    The pins can be shared with other motors, but not with
+                                    interrupt handlers set outside this module.
+                limit_debounce_ms (int): time after a limit stop during which the switches are ignored,
+                                    so the motor can back off a switch that is still bouncing. Default is 250.
         """
 
-        self.step_pin = Pin(step_pin, Pin.OUT)
+        self.step_pin = Pin(step_pin, Pin.OUT, value=LOW)
         self.dir_pin = Pin(dir_pin, Pin.OUT)
-        self.enable_pin = Pin(enable_pin, Pin.OUT)
+        self._has_enable = enable_pin is not None
+        self.enable_pin = Pin(enable_pin, Pin.OUT) if self._has_enable else None
+        self.enabled = None  # unknown until enable() or disable() is called
+
+        # bound pin methods, bound once instead of looked up on every call
+        self._dir_set = self.dir_pin.value
+        self._enable_set = self.enable_pin.value if self._has_enable else None
+
+        # SIO register and mask used to toggle the step pin without going through Pin.value()
+        self._xor = SIO_GPIO_OUT_XOR
+        self._mask = 1 << step_pin
+        self._dir_mask = 1 << dir_pin  # for setting the direction pins of several motors in one store
+
+        # hot per motor values packed in one buffer for the viper loops, see STATE_*
+        self._state = array('i', [0] * STATE_LEN)
+        self._state[STATE_MASK] = self._mask
 
         # Class constants
         self.CCW = dvr_CW  # Counter-Clockwise direction
         self.CW = dvr_CCW  # Clockwise direction.
+        self._dir_invert = 0  # XORed into the direction pin value, see _flip_ccw_cw()
+        self._dir_value = -1  # last value written to the direction pin
+
+        self.target_position = 0  # target position in steps
+        self._target_micro = 0  # target position in microsteps (stored in self._state)
+        self.position = 0  # position in microsteps (stored in self._state)
+        self.step_mode = step_mode
+
+        # acceleration profile, see set_accel()
+        self._accel = 0
+        self._ramp = array('I')  # step delays from rest up to cruise speed
+        self._ramp_down = array('I')  # same delays in reverse order
+        self._ramp_slow = 0  # number of leading self._ramp delays above SPIN_LIMIT_US
+        self._cruise_us = 0  # cruise delay in microseconds
+        self._cruise_q16 = 0  # cruise delay in 16.16 fixed point microseconds
+        self._delay_q16 = 0  # 0 until set_speed() is called
+        self.delay_us = 0
 
+        # held while a move started by move_to_abs_async() or a timer move runs
+        self._move_lock = _thread.allocate_lock()
+        self._core1_thread = None  # _thread.get_ident() of the core1 thread of the running async move
+
+        # hardware timer driving move_to_abs_timer() and move_steps_timer(), the callback is bound once
+        # so starting a move does not allocate a bound method
+        self._timer = Timer()
+        self._timer_cb = self._timer_step
+        self._remaining = 0
+
+        # pulses sent so far by the running _pulse_train(), so an interrupted
+        # move (e.g. KeyboardInterrupt) still leaves the position exact
+        self._pulses_done = 0
+
+        # limit switches, validated once here and read as one GPIO mask by the pulse loops
+        self.limits = LimitGroup(kwargs.get('limit_pins', ()))
+        self._limit_mask = self.limits._mask
+        self._limit_debounce_ms = kwargs.get('limit_debounce_ms', 250)
+        self._limit_deadline = None  # ticks_ms() value the debounce ends at, None when armed
+        self._state[STATE_LIMIT] = self._limit_mask
+        self._latch = self._state  # buffer and index written by the limit interrupt, see _set_latch()
+        self._latch_index = STATE_HIT
+        _register_limits(self)
+
+        self._m0_pin = self._m1_pin = self._m2_pin = None
         if 'mode_pins' in kwargs:
             # Checking if 'mode_pins' is in **kwargs, if so initialize pins
             m0, m1, m2 = kwargs['mode_pins']
@@ -55,11 +777,7 @@ class Stepper:
             self._m1_pin = Pin(m1, Pin.OUT) if m1 is not None else None
             self._m2_pin = Pin(m2, Pin.OUT) if m2 is not None else None
             self.set_step_mode(step_mode)
-        else:
-            self.step_mode = step_mode
 
-        self.target_position = 0  # target position in steps
-        self.position = 0  # position in steps
         self.set_direction(self.CCW)
 
     def set_step_mode(self, step_mode=1) -> None:
@@ -77,39 +795,58 @@ class Stepper:
                     - 16: 1/16 step
                     - 32: 1/32 step
         '''
-        step_modes = {
-            1: (0, 0, 0),    # Full step
-            2: (1, 0, 0),    # Half step
-            4: (0, 1, 0),    # Quarter step
-            8: (1, 1, 0),    # 1/8 step
-            16: (0, 0, 1),   # 1/16 step
-            32: (1, 0, 1),   # 1/32 step
-        }
+        if not 0 < step_mode < len(self._MODE_BITS):
+            return
+        bits = self._MODE_BITS[step_mode]
+        if bits is None:
+            return
 
-        m_pins = [self._m0_pin, self._m1_pin, self._m2_pin]
+        # keep the microstep positions pointing at the same physical position
+        self.position = self.position * step_mode // self.step_mode
+        self._target_micro = self._target_micro * step_mode // self.step_mode
+        self.step_mode = step_mode
 
-        if step_mode in step_modes:
-            self.step_mode = step_mode
-            for pin, val in zip(m_pins, step_modes[step_mode]):
-                if pin:
-                    pin.value(val)
+        m0, m1, m2 = bits
+        if self._m0_pin is not None:
+            self._m0_pin.value(m0)
+        if self._m1_pin is not None:
+            self._m1_pin.value(m1)
+        if self._m2_pin is not None:
+            self._m2_pin.value(m2)
 
     def enable(self) -> None:
         '''
         Function to enable the motor for operation.
         '''
         self.enabled = True
-        if self.enable_pin:
-            self.enable_pin.value(LOW)
+        if self._has_enable:
+            self._enable_set(LOW)
 
     def disable(self) -> None:
         '''
         Function to disable the motor from operation.
+        Does nothing if the motor is already disabled.
         '''
-
+        if self.enabled is False:
+            return
         self.enabled = False
-        if self.enable_pin:
-            self.enable_pin.value(HIGH)
+        if self._has_enable:
+            self._enable_set(HIGH)
+
+    def deinit(self) -> None:
+        '''
+        Function to release the motor once it is no longer used.
+            - A running timer move is stopped, an async move is waited for.
+            - The motor is removed from the interrupt handlers of its limit switch GPIOs,
+              the handler of a GPIO is removed with its last motor. Otherwise the handlers
+              keep latching the motor and keep the object from being freed.
+        '''
+        self._timer.deinit()
+        if self._remaining > 0:  # timer move stopped before its end
+            self._remaining = 0
+            self._move_lock.release()
+        self.wait_until_idle()
+        _unregister_limits(self)
 
     def set_speed(self, speed: float) -> None:
         '''
@@ -124,8 +861,111 @@ class Stepper:
 
         Returns:
             None
+
+        Raises:
+            ValueError: if speed is zero.
+        '''
+        if not speed:
+            raise ValueError('speed cannot be zero')
+
+        # delay in 16.16 fixed point microseconds, integer math for integer speeds,
+        # the fraction is carried between steps by the pulse loops
+        speed = abs(speed)
+        if isinstance(speed, int):
+            delay_q16 = (1_000_000 << 16) // speed
+        else:
+            delay_q16 = int((1_000_000 << 16) / speed)
+        self._set_delay_q16(delay_q16)
+
+    def set_speed_q16(self, speed_q16: int) -> None:
+        '''
+        Set the speed of the stepper motor from a 16.16 fixed point step rate, with integer math only.
+        For fractional speeds without float math, e.g. set_speed_q16(int(12.5 * 65536)) for 12.5 steps/s.
+
+        Parameters:
+            speed_q16 (int): The desired speed of the motor in steps per second, 16.16 fixed point.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: if speed_q16 is zero.
+        '''
+        if not speed_q16:
+            raise ValueError('speed cannot be zero')
+        self._set_delay_q16((1_000_000 << 32) // abs(speed_q16))
+
+    def _set_delay_q16(self, delay_q16: int) -> None:
+        '''
+        Function to set the delay between steps, in 16.16 fixed point microseconds.
+        '''
+        self._delay_q16 = max(2 << 16, delay_q16)  # >= DVR8825 min pulse width
+        self.delay_us = self._delay_q16 >> 16  # delay in microseconds
+        self._build_ramp()
+
+    def set_accel(self, accel: float) -> None:
+        '''
+        Set the acceleration of the stepper motor, moves then follow a trapezoidal
+        speed profile instead of starting and stopping at full speed.
+
+        The per step delays are computed once here (and on set_speed), so the
+        move loop only reads them from a table. Can be called before or after set_speed.
+
+        Parameters:
+            accel (float): The acceleration in steps per second squared.
+                    0 disables the acceleration profile.
+
+        Returns:
+            None
+        '''
+        self._accel = abs(accel)
+        if self._delay_q16:
+            self._build_ramp()  # otherwise built by set_speed()
+
+    def _check_speed(self) -> None:
+        '''
+        Function to check that a speed has been set, moves would otherwise pulse without any delay.
+
+        Raises:
+            RuntimeError: if set_speed() has not been called.
         '''
-        self.delay = 1 / abs(speed)  # delay in seconds
+        if not self._delay_q16:
+            raise RuntimeError('no speed set, call set_speed() first')
+
+    def _build_ramp(self) -> None:
+        '''
+        Function to compute the acceleration delay table for the current speed and acceleration.
+            - The delays follow D. Austin's recurrence c_i = c_(i-1) - 2 * c_(i-1) / (4 * i + 1),
+              computed with integers in 8 bit fixed point. Only the first delay
+              c_0 = 0.676 * sqrt(2 / a) uses floats, 0.676 corrects the error of the first step.
+            - The table stops once the cruise delay is reached or after MAX_RAMP_STEPS,
+              in which case the cruise speed is limited to the last delay of the table.
+            - The delays decrease, the first self._ramp_slow ones are above SPIN_LIMIT_US
+              and are slept through (see _pulse_runs()).
+        '''
+        ramp = array('I')
+        cruise_us = self.delay_us
+        cruise_q16 = self._delay_q16
+        if self._accel:
+            c = int(676_000 * sqrt(2 / self._accel)) << 8
+            for i in range(1, MAX_RAMP_STEPS + 1):
+                delay_us = c >> 8
+                if delay_us <= cruise_us:
+                    break
+                ramp.append(delay_us)
+                c -= (2 * c) // (4 * i + 1)
+            else:
+                cruise_us = ramp[-1]
+                cruise_q16 = cruise_us << 16
+
+        self._ramp = ramp
+        self._ramp_down = array('I', reversed(ramp))
+        n_slow = 0
+        while n_slow < len(ramp) and ramp[n_slow] > SPIN_LIMIT_US:
+            n_slow += 1
+        self._ramp_slow = n_slow
+        self._cruise_us = cruise_us
+        self._cruise_q16 = cruise_q16
 
     def _flip_ccw_cw(self) -> None:
         '''
@@ -136,12 +976,12 @@ class Stepper:
         CW -> CCW
 
         '''
-        self.CCW = not self.CCW
-        self.CW = not self.CW
+        self._dir_invert ^= 1
 
     def set_direction(self, direction: 0 | 1) -> None:
         '''
         Set the direction of the stepper motor.
+        The direction pin is only written when its value changes.
 
         Parameters:
             direction (1 | 0): The desired direction of the motor rotation.
@@ -149,8 +989,26 @@ class Stepper:
         Returns:
             None
         '''
-        self.dir_pin.value(direction)
+        value = self._dir_update(direction)
+        if value >= 0:
+            self._dir_set(value)
+
+    def _dir_update(self, direction: 0 | 1) -> int:
+        '''
+        Function to record a new direction without writing the direction pin.
+
+        Returns:
+            int: direction pin value to write, -1 if the pin already has it.
+        '''
+        if (direction | 1) != 1:
+            raise ValueError('direction must be 0 or 1')
         self.direction = direction
+        self._step_delta = 1 - (direction << 1)  # position change per microstep, +1 for CW (0), -1 for CCW (1)
+        value = direction ^ self._dir_invert
+        if value == self._dir_value:
+            return -1
+        self._dir_value = value
+        return value
 
     def set_target_pos(self, target_pos: int) -> None:
         '''
@@ -163,23 +1021,110 @@ class Stepper:
             None
         '''
         self.target_position = target_pos
+        self._target_micro = target_pos * self.step_mode
 
-    def steps_to_target(self) -> float:
+    @property
+    def position(self) -> int:
         '''
-        Function to get the number of steps to the target position
+        Current position of the motor in microsteps.
         '''
+        return self._state[STATE_POS]
+
+    @position.setter
+    def position(self, value: int) -> None:
+        self._state[STATE_POS] = value
+
+    @property
+    def _target_micro(self) -> int:
+        return self._state[STATE_TGT]
 
-        distance = self.target_position - self.position
+    @_target_micro.setter
+    def _target_micro(self, value: int) -> None:
+        self._state[STATE_TGT] = value
+
+    @property
+    def position_steps(self) -> int:
+        '''
+        Current position of the motor in (full) steps.
+        '''
+        return self.position // self.step_mode
+
+    def steps_to_target(self) -> int:
+        '''
+        Function to get the number of microsteps to the target position
+        '''
+
+        distance = self._target_micro - self.position
         return distance
 
+    def _armed_limit_mask(self) -> int:
+        '''
+        Function to get the limit mask to check, 0 while the switches are debounced after a limit stop.
+        '''
+        if self._limit_deadline is not None:
+            if utime.ticks_diff(utime.ticks_ms(), self._limit_deadline) < 0:
+                return 0
+            self._limit_deadline = None
+        return self._limit_mask
+
+    def _limit_stop(self) -> None:
+        '''
+        Function to start the debounce window after a move was stopped by a limit switch.
+        '''
+        self._limit_deadline = utime.ticks_add(utime.ticks_ms(), self._limit_debounce_ms)
+
+    def _limit_isr(self, pin) -> None:
+        '''
+        Limit switch interrupt handler, latches the edge for the running move unless the switches are debounced.
+            - Called from the shared handler of the pin, see _register_limits().
+        '''
+        if self._state[STATE_LIMIT]:
+            self._latch[self._latch_index] = 1
+
+    def _arm_limits(self) -> int:
+        '''
+        Function to arm the limit switches for a move, STATE_LIMIT gets the debounced mask and the latch is cleared.
+
+        Returns:
+            int: limit mask of the move.
+        '''
+        limit_mask = self._armed_limit_mask()
+        self._state[STATE_LIMIT] = limit_mask
+        self._state[STATE_HIT] = 0
+        return limit_mask
+
+    def _set_latch(self, latch, index: int) -> None:
+        '''
+        Function to redirect the limit interrupt latch to latch[index], e.g. into the buffer
+        read by a multi-axis kernel. The interrupts are disabled so the handler never sees
+        the new buffer with the old index.
+        '''
+        irq_state = disable_irq()
+        self._latch = latch
+        self._latch_index = index
+        enable_irq(irq_state)
+
+    @micropython.native
+    def _limits_hit(self) -> bool:
+        '''
+        Function to check if any limit switch of the motor is HIGH.
+            - Always False without limit pins or while the switches are debounced.
+        '''
+        return (mem32[SIO_GPIO_IN] & self._armed_limit_mask()) != 0
+
+    @micropython.native
     def one_step(self) -> None:
         '''
         Function to take one step.
         '''
-        self.step_pin.value(1)
-        utime.sleep(self.delay)
-        self.step_pin.value(0)
+        self._check_speed()
+        xor_reg, mask = self._xor, self._mask
+        mem32[xor_reg] = mask
+        _udelay(STEP_PULSE_US)
+        mem32[xor_reg] = mask
+        _delay_us(self.delay_us)
 
+    @micropython.native
     def move_to_abs(self, target_pos: int) -> None:
         '''
         Move the stepper motor to the target position in absolute steps.
@@ -190,13 +1135,636 @@ class Stepper:
         Returns:
             None
         '''
+        held = self._hold_move()
+        try:
+            self.set_target_pos(target_pos)
+            self._move()
+        finally:
+            if held:
+                self._move_lock.release()
+
+    @micropython.native
+    def move_steps(self, steps: int, interval_us=None) -> None:
+        '''
+        Move the stepper motor by a number of steps relative to the current position.
+
+        Parameters:
+            steps (int): The number of steps to move, the sign gives the direction
+                    (positive towards CW, negative towards CCW).
+            interval_us (int | array('I') | None): Optional delay between steps for this move only.
+                    - None: use the speed and acceleration profile (default).
+                    - int: constant delay in microseconds, raised to at least 2 us (DVR8825 min pulse width).
+                    - array('I'): delay of each step in microseconds, e.g. a precomputed
+                      S-curve, with at least abs(steps) * step_mode items.
+                      The items are not checked, each must be at least 2 us.
+
+        Returns:
+            None
+        '''
+        if not isinstance(interval_us, (int, type(None))) and len(interval_us) < abs(steps) * self.step_mode:
+            raise ValueError('interval_us must hold a delay for every step')
+        if isinstance(interval_us, int):
+            interval_us = max(2, interval_us)  # >= DVR8825 min pulse width
+        held = self._hold_move()
+        try:
+            self._target_micro = self.position + steps * self.step_mode
+            self.target_position = self._target_micro // self.step_mode
+            self._move(interval_us)
+        finally:
+            if held:
+                self._move_lock.release()
+
+    def move_sequence(self, segments) -> None:
+        '''
+        Move the stepper motor through a sequence of relative moves, planned in advance.
+            - Each move collects garbage and disables the collector only while it pulses,
+              as move_steps() does, so the pauses and the segments themselves may allocate.
+            - Each move still ramps down to a stop (with an acceleration profile),
+              a change of direction at full speed would lose steps.
+            - The PIO state machine of a PIOStepper keeps running between the moves.
+            - The sequence stops at the first move cut short by a limit switch.
+
+        Parameters:
+            segments (iterable[tuple[int, int]]): (steps, pause_ms) pairs, steps as in move_steps()
+                    and pause_ms the pause after the move in milliseconds, 0 for none.
+
+        Returns:
+            None
+        '''
+        for steps, pause_ms in segments:
+            self.move_steps(steps)
+            if self.position != self._target_micro:
+                break
+            if pause_ms:
+                utime.sleep_ms(pause_ms)
+
+    @micropython.native
+    def _move(self, intervals=None) -> None:
+        '''
+        Function to move to the target position, the direction is set once for the whole move.
+            - The garbage collector is run before and disabled during the move,
+              so a collection cannot stall the pulse train.
+            - On core1 (async moves) the collector is left alone: gc.disable() applies to the
+              whole interpreter and would stop automatic collection for the code on core0.
+            - intervals is passed on to _pulse_train(), without it a speed must have been set (see _check_speed()).
+            - The position is updated once at the end, also when the move is interrupted.
+            - A move stopped short by a limit switch starts the limit debounce window.
+        '''
+        if intervals is None:
+            self._check_speed()
+        distance = self.steps_to_target()
+        if not distance:
+            return  # no DIR pin transition or GC work for an empty move
+        self.set_direction(self.CW if distance > 0 else self.CCW)
+
+        gc_enabled = _thread.get_ident() != self._core1_thread and gc.isenabled()
+        if gc_enabled:
+            gc.collect()
+            gc.disable()
+        self._pulses_done = 0
+        self._arm_limits()
+        try:
+            _udelay(DIR_SETUP_US)
+            self._pulse_train(abs(distance), intervals)
+            if self._pulses_done < abs(distance):
+                self._limit_stop()
+        finally:
+            if gc_enabled:
+                gc.enable()
+            self.position += self._step_delta * self._pulses_done
+
+    def move_to_abs_async(self, target_pos: int) -> None:
+        '''
+        Start moving the stepper motor to the target position on the second core (core1)
+        and return immediately, leaving core0 free for I/O or planning the next move.
+
+        Waits for the previous async move to finish first. Core1 runs only one
+        thread at a time, so only one motor can be moving asynchronously at once,
+        the async move of another motor also waits for it.
+
+        Parameters:
+            target_pos (int): The desired target position in steps, in absolute position.
+
+        Returns:
+            None
+        '''
+        self._check_speed()
+        self._move_lock.acquire()
+        try:
+            _start_core1(self._run_move, (self.move_to_abs, target_pos))
+        except BaseException:
+            self._move_lock.release()
+            raise
+
+    def move_steps_async(self, steps: int) -> None:
+        '''
+        Start moving the stepper motor by a number of steps relative to the current position
+        on the second core (core1) and return immediately, see move_to_abs_async().
+
+        The steps are counted from the position the previous async move ends at.
+        A limit switch stops the move on core1 through the latched interrupt flag.
+
+        Parameters:
+            steps (int): The number of steps to move, the sign gives the direction
+                    (positive towards CW, negative towards CCW).
+
+        Returns:
+            None
+        '''
+        self._check_speed()
+        self._move_lock.acquire()
+        try:
+            _start_core1(self._run_move, (self.move_steps, steps))
+        except BaseException:
+            self._move_lock.release()
+            raise
+
+    def move_to_abs_timer(self, target_pos: int) -> None:
+        '''
+        Start moving the stepper motor to the target position, one step per hardware
+        timer interrupt, and return immediately. The CPU is only used for the
+        interrupts, use it for slow to moderate speeds (up to a few kHz).
+
+        The acceleration profile is not used. Waits for the previous
+        asynchronous move of this motor to finish first.
+
+        Parameters:
+            target_pos (int): The desired target position in steps, in absolute position.
+
+        Returns:
+            None
+        '''
+        self._check_speed()
+        self._move_lock.acquire()
         self.set_target_pos(target_pos)
-        self.set_direction(self.CW if target_pos > self.position else self.CCW)
+        self._start_timer()
 
-        step_increment = 1 if self.direction == self.CW else -1
-        while self.steps_to_target() != 0:
-            self.one_step()
-            self.position += step_increment / self.step_mode  # compensate for microstepping
+    def move_steps_timer(self, steps: int) -> None:
+        '''
+        Start moving the stepper motor by a number of steps relative to the current position,
+        driven by the hardware timer like move_to_abs_timer(), and return immediately.
+
+        Parameters:
+            steps (int): The number of steps to move, the sign gives the direction
+                    (positive towards CW, negative towards CCW).
+
+        Returns:
+            None
+        '''
+        self._check_speed()
+        self._move_lock.acquire()
+        self._target_micro = self.position + steps * self.step_mode
+        self.target_position = self._target_micro // self.step_mode
+        self._start_timer()
+
+    def _start_timer(self) -> None:
+        '''
+        Function to start the timer move to the target position, the move lock must be held.
+        '''
+        distance = self.steps_to_target()
+        if not distance:
+            self._move_lock.release()
+            return
+
+        self.set_direction(self.CW if distance > 0 else self.CCW)
+        self._remaining = abs(distance)
+        self._arm_limits()
+        self._timer.init(freq=1_000_000 / (self._cruise_us + STEP_PULSE_US),
+                         mode=Timer.PERIODIC, callback=self._timer_cb)
+
+    def _timer_step(self, timer) -> None:
+        '''
+        Timer callback of the timer moves, emits one pulse and stops the timer
+        at the target or once a limit switch is HIGH.
+        '''
+        remaining = self._remaining
+        state = self._state
+        if not (mem32[SIO_GPIO_IN] & state[STATE_LIMIT] or state[STATE_HIT]):
+            xor_reg, mask = self._xor, self._mask
+            mem32[xor_reg] = mask
+            _udelay(STEP_PULSE_US)
+            mem32[xor_reg] = mask
+            state[STATE_POS] += self._step_delta
+            remaining -= 1
+        else:
+            remaining = 0
+            self._limit_stop()
+        self._remaining = remaining
+        if remaining <= 0:
+            timer.deinit()
+            self._move_lock.release()
+
+    def _run_move(self, move, arg: int) -> None:
+        '''
+        Function run on core1 by move_to_abs_async() and move_steps_async(), runs move(arg).
+        '''
+        self._core1_thread = _thread.get_ident()
+        try:
+            move(arg)
+        finally:
+            self._core1_thread = None
+            self._move_lock.release()
+            _core1_lock.release()
+
+    def _hold_move(self) -> bool:
+        '''
+        Function to take the move lock for a blocking move, waits for the running async or timer move first.
+        Blocking moves then cannot overlap an asynchronous move of the same motor.
+
+        Returns:
+            bool: True if the lock was taken and must be released, False when called from
+                  the core1 thread of an async move, which already holds it.
+        '''
+        if _thread.get_ident() == self._core1_thread:
+            return False
+        self._move_lock.acquire()
+        return True
+
+    def is_moving(self) -> bool:
+        '''
+        Function to check if a move started by move_to_abs_async() or a timer move is still running.
+        '''
+        return self._move_lock.locked()
+
+    def wait_until_idle(self) -> None:
+        '''
+        Function to block until the move started by move_to_abs_async() or a timer move is done.
+        '''
+        self._move_lock.acquire()
+        self._move_lock.release()
+
+    @micropython.native
+    def _pulse_train(self, step_count: int, intervals=None) -> None:
+        '''
+        Function to emit step_count pulses in the current direction.
+            - intervals None follows the trapezoidal profile set by set_accel(): accelerate, cruise, decelerate.
+            - intervals int is a constant delay in microseconds, a buffer the delay of each step.
+            - Subclasses override this to generate the pulses elsewhere (e.g. PIO).
+            - Every pulse sent is counted in self._pulses_done.
+            - Stops at the first segment cut short by a limit switch.
+            - Delays above SPIN_LIMIT_US, in the ramps or in intervals, are slept through (see _pulse_runs()).
+        '''
+        if intervals is not None:
+            if isinstance(intervals, int):
+                self._pulse_const(step_count, intervals << 16)
+            else:
+                # the runs are found before the first pulse, a scan between pulses would stretch a delay
+                bounds = []
+                slow = False
+                for i in range(step_count):
+                    if (intervals[i] > SPIN_LIMIT_US) != slow:
+                        bounds.append(i)
+                        slow = not slow
+                bounds.append(step_count)
+                self._pulse_runs(intervals, bounds)
+            return
+
+        ramp_len = len(self._ramp)
+        n_accel = min(ramp_len, step_count // 2)
+        n_decel = min(ramp_len, step_count - n_accel)
+        n_cruise = step_count - n_accel - n_decel
+
+        # the slow delays are at the start of the ramp up and at the end of the ramp down
+        if not self._pulse_runs(self._ramp, (0, min(self._ramp_slow, n_accel), n_accel)):
+            return
+        if not self._pulse_const(n_cruise, self._cruise_q16):
+            return
+        if n_decel:
+            self._pulse_runs(memoryview(self._ramp_down)[ramp_len - n_decel:],
+                             (n_decel - min(self._ramp_slow, n_decel), n_decel))
+
+    def _pulse_runs(self, delays, bounds) -> bool:
+        '''
+        Function to emit one pulse per delay of the buffer delays, in runs split at bounds.
+            - bounds lists the end index of each run, the runs alternate between
+              delays up to SPIN_LIMIT_US (first) and delays above it.
+            - The short delays are timed by the _pulse_table() busy-wait, which cannot be interrupted,
+              the long ones are slept through (see _delay_us()) as in _pulse_const().
+
+        Returns:
+            bool: True if every pulse was sent, False if a limit switch stopped the pulses.
+        '''
+        delays = memoryview(delays)
+        state = self._state
+        start = 0
+        slow = False
+        for end in bounds:
+            if end > start:
+                if slow:
+                    done = self._pulse_slow(delays[start:end], end - start)
+                else:
+                    done = _pulse_table(delays[start:end], end - start, state)
+                    self._pulses_done += done
+                if done < end - start:
+                    return False
+            start = end
+            slow = not slow
+        return True
+
+    def _pulse_slow(self, delays, step_count: int) -> int:
+        '''
+        Function to emit step_count pulses, sleeping through the delay of each step read from delays.
+
+        Returns:
+            int: number of pulses emitted.
+        '''
+        # bind everything used in the loop to locals,
+        # globals and attributes are dict lookups on every access
+        xor_reg, mask, state = self._xor, self._mask, self._state
+        limit_mask = state[STATE_LIMIT]
+        regs, udelay, delay_us, in_addr = mem32, _udelay, _delay_us, SIO_GPIO_IN
+        i = 0
+        try:
+            while i < step_count:
+                if regs[in_addr] & limit_mask or state[STATE_HIT]:
+                    break
+                regs[xor_reg] = mask
+                udelay(STEP_PULSE_US)
+                regs[xor_reg] = mask
+                i += 1
+                delay_us(delays[i - 1])
+        finally:
+            self._pulses_done += i
+        return i
+
+    def _pulse_const(self, step_count: int, delay_q16: int) -> bool:
+        '''
+        Function to emit step_count pulses with a constant delay, in 16.16 fixed point microseconds.
+
+        Returns:
+            bool: True if every pulse was sent, False if a limit switch stopped the pulses.
+        '''
+        step_delay_us = delay_q16 >> 16
+        if step_delay_us > SPIN_LIMIT_US:
+            # slow enough for the interpreter, sleep instead of holding the core
+            # bind everything used in the loop to locals,
+            # globals and attributes are dict lookups on every access
+            xor_reg, mask, state = self._xor, self._mask, self._state
+            limit_mask = state[STATE_LIMIT]
+            regs, udelay, delay_us, in_addr = mem32, _udelay, _delay_us, SIO_GPIO_IN
+            # count down in a while loop, no range object and __next__ call per step
+            steps_to_do = step_count
+            try:
+                while steps_to_do:
+                    if regs[in_addr] & limit_mask or state[STATE_HIT]:
+                        break
+                    regs[xor_reg] = mask
+                    udelay(STEP_PULSE_US)
+                    regs[xor_reg] = mask
+                    steps_to_do -= 1
+                    delay_us(step_delay_us)
+            finally:
+                self._pulses_done += step_count - steps_to_do
+            return not steps_to_do
+
+        done = _pulse_n(step_count, delay_q16, self._state)
+        self._pulses_done += done
+        return done == step_count
+
+
+class PIOStepper(Stepper):
+    '''
+    Stepper class generating the step pulse train with an RP2040 PIO state machine.
+
+    Moves are queued to the state machine as (count, delay) word pairs, the
+    acceleration ramps are streamed from their precomputed tables by DMA, so the
+    CPU only sets up a few transfers per move and the pulse timing is free of
+    interpreter jitter.
+
+    The state machine and DMA channel are claimed on the first move.
+    Only available where the rp2 module is (see HAS_PIO).
+    '''
+
+    def __init__(self, step_pin: int, dir_pin: int, enable_pin: int | None, step_mode=1, sm_id=0, **kwargs) -> None:
+        """
+        Initializes the PIO stepper motor controller instance.
+
+        Parameters:
+            step_pin, dir_pin, enable_pin, step_mode, **kwargs: see Stepper.
+                        limit_pins is not supported, the state machine cannot be stopped by the switches.
+            sm_id (int): PIO state machine number to use (0-7).
+                        Default is 0.
+
+        Raises:
+            RuntimeError: if the port has no rp2 module.
+            ValueError: if limit_pins is given.
+        """
+        if not HAS_PIO:
+            raise RuntimeError('PIOStepper needs the rp2 module')
+        if kwargs.get('limit_pins'):
+            raise ValueError('PIOStepper does not support limit_pins, use Stepper for moves stopped by limit switches')
+        super().__init__(step_pin, dir_pin, enable_pin, step_mode, **kwargs)
+        self._ramp_words = array('I')  # self._ramp as (1, delay) word pairs
+        self._ramp_down_words = array('I')
+
+        self._sm_id = sm_id
+        self._sm = None  # created by _start_sm() on the first move
+        self._segment_words = array('I')  # words of queue_segments(), kept alive while the DMA reads them
+
+    def _start_sm(self) -> None:
+        '''
+        Function to start the state machine and claim the DMA channel feeding its TX FIFO.
+        '''
+        sm_id = self._sm_id
+        self._sm = rp2.StateMachine(sm_id, _step_prog, freq=PIO_FREQ, sideset_base=self.step_pin)
+        self._sm.active(1)
+
+        # DMA channel feeding the ramp tables to the state machine TX FIFO
+        pio, index = divmod(sm_id, 4)
+        self._txf = (PIO1_TXF0 if pio else PIO0_TXF0) + 4 * index
+        self._dma = rp2.DMA()
+        self._dma_ctrl = self._dma.pack_ctrl(size=2, inc_write=False,
+                                             treq_sel=(DREQ_PIO1_TX0 if pio else DREQ_PIO0_TX0) + index)
+
+    def _build_ramp(self) -> None:
+        '''
+        Function to compute the acceleration tables, also as (1, delay) word pairs for the state machine.
+        '''
+        super()._build_ramp()
+        words = array('I')
+        for delay_us in self._ramp:
+            words.append(1)
+            words.append(max(0, delay_us - PIO_LOW_OVERHEAD))
+        self._ramp_words = words
+
+        words = array('I')
+        for delay_us in self._ramp_down:
+            words.append(1)
+            words.append(max(0, delay_us - PIO_LOW_OVERHEAD))
+        self._ramp_down_words = words
+
+    def _stream(self, words, step_count: int) -> None:
+        '''
+        Function to send a buffer of (count, delay) words to the state machine by DMA,
+        returns once the last word has been written to the TX FIFO.
+            - The step_count pulses of the buffer are counted in self._pulses_done before
+              the transfer starts, the DMA still sends them if the wait is interrupted.
+        '''
+        self._pulses_done += step_count
+        self._dma.config(read=words, write=self._txf, count=len(words),
+                         ctrl=self._dma_ctrl, trigger=True)
+        while self._dma.active():
+            pass
+
+    def _drain(self) -> None:
+        '''
+        Function to block until the segments queued by queue_segments() have been sent.
+        '''
+        if self._sm is None:
+            return
+        while self._dma.active():
+            pass
+        self._wait_done()
+
+    def _move(self, intervals=None) -> None:
+        '''
+        Function to move to the target position, see Stepper._move().
+            - Waits for the queued segments first, the direction must not change under them.
+        '''
+        self._drain()
+        super()._move(intervals)
+
+    def move_to_abs_timer(self, target_pos: int) -> None:
+        '''
+        Not supported, the step pin is driven by the state machine and cannot be toggled by the timer.
+        Use move_to_abs_async() or queue_segments() instead.
+
+        Raises:
+            NotImplementedError: always.
+        '''
+        raise NotImplementedError('PIOStepper has no timer moves, use move_to_abs_async() or queue_segments()')
+
+    def move_steps_timer(self, steps: int) -> None:
+        '''
+        Not supported, see move_to_abs_timer().
+
+        Raises:
+            NotImplementedError: always.
+        '''
+        raise NotImplementedError('PIOStepper has no timer moves, use move_steps_async() or queue_segments()')
+
+    def wait_until_idle(self) -> None:
+        '''
+        Function to block until the running move and the segments queued by queue_segments() are done.
+        '''
+        super().wait_until_idle()
+        self._drain()
+
+    def queue_segments(self, segments) -> None:
+        '''
+        Function to queue constant speed segments to the state machine by DMA and return immediately.
+            - The segments run back to back, the speed changes between them take no CPU time.
+            - All segments must move in the same direction, a change of direction
+              first waits for the segments queued before.
+            - The position is updated when the segments are queued, use
+              wait_until_idle() to wait for the motor to get there.
+
+        Parameters:
+            segments (iterable[tuple[int, int]]): (steps, interval_us) pairs, steps relative to the
+                    end of the previous segment and interval_us the delay between microsteps in microseconds.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: if the segments do not all move in the same direction.
+        '''
+        words = array('I')
+        total = 0
+        for steps, interval_us in segments:
+            if steps:
+                if total and (steps > 0) != (total > 0):
+                    raise ValueError('segments must all move in the same direction')
+                words.append(abs(steps) * self.step_mode)
+                words.append(max(0, interval_us - PIO_LOW_OVERHEAD))
+                total += steps
+        if not words:
+            return
+
+        held = self._hold_move()
+        try:
+            if self._sm is None:
+                self._start_sm()
+            while self._dma.active():
+                pass
+            direction = self.CW if total > 0 else self.CCW
+            if direction != self.direction:
+                self._wait_done()
+                self.set_direction(direction)
+                _udelay(DIR_SETUP_US)
+
+            self._segment_words = words
+            self._dma.config(read=words, write=self._txf, count=len(words),
+                             ctrl=self._dma_ctrl, trigger=True)
+            self.position += total * self.step_mode
+            self._target_micro = self.position
+            self.target_position = self._target_micro // self.step_mode
+        finally:
+            if held:
+                self._move_lock.release()
+
+    def _pulse_train(self, step_count: int, intervals=None) -> None:
+        '''
+        Function to emit step_count pulses, following the trapezoidal profile set by set_accel()
+        or the intervals given to move_steps().
+            - Queued pulses are counted in self._pulses_done, the state machine
+              still sends them if the wait is interrupted.
+        '''
+        if not step_count:
+            return
+        if self._sm is None:
+            self._start_sm()
+
+        if intervals is not None:
+            if isinstance(intervals, int):
+                self._put_const(step_count, intervals << 16)
+            else:
+                words = array('I')
+                for delay_us in memoryview(intervals)[:step_count]:
+                    words.append(1)
+                    words.append(max(0, delay_us - PIO_LOW_OVERHEAD))
+                self._stream(words, step_count)
+            self._wait_done()
+            return
+
+        ramp_len = len(self._ramp)
+        n_accel = min(ramp_len, step_count // 2)
+        n_decel = min(ramp_len, step_count - n_accel)
+        n_cruise = step_count - n_accel - n_decel
+
+        if n_accel:
+            self._stream(memoryview(self._ramp_words)[:2 * n_accel], n_accel)
+        if n_cruise:
+            self._put_const(n_cruise, self._cruise_q16)
+        if n_decel:
+            self._stream(memoryview(self._ramp_down_words)[2 * (ramp_len - n_decel):], n_decel)
+        self._wait_done()
+
+    def _put_const(self, step_count: int, delay_q16: int) -> None:
+        '''
+        Function to queue step_count pulses with a constant delay, in 16.16 fixed point microseconds.
+            - Split in two segments, 1 us apart, so the average delay matches the fractional part.
+            - Each segment is counted in self._pulses_done as soon as its words are in the TX FIFO.
+        '''
+        sm = self._sm
+        delay_us = delay_q16 >> 16
+        n_long = (step_count * (delay_q16 & 0xffff)) >> 16
+        if step_count - n_long:
+            sm.put(step_count - n_long)
+            sm.put(max(0, delay_us - PIO_LOW_OVERHEAD))
+            self._pulses_done += step_count - n_long
+        if n_long:
+            sm.put(n_long)
+            sm.put(max(0, delay_us + 1 - PIO_LOW_OVERHEAD))
+            self._pulses_done += n_long
+
+    def _wait_done(self) -> None:
+        '''
+        Function to block until every queued pulse has been sent.
+        '''
+        self._sm.put(0)  # fence
+        self._sm.put(0)
+        self._sm.get()
 
 
 # **************************** Examples ****************************
@@ -213,9 +1781,9 @@ if __name__ == '__main__':
     limit_swt = Pin(14, Pin.IN)
 
     try:
-        print(f'Before: {stepper.position}')
+        print(f'Before: {stepper.position_steps}')
         stepper.move_to_abs(2000)
-        print(f'after: {stepper.position}')
+        print(f'after: {stepper.position_steps}')
 
         stepper.disable()
 
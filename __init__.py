@@ -1,3 +1,8 @@
 from .DVR8825_Driver import (
-    Stepper
+    Stepper,
+    PIOStepper,
+    StepperBank,
+    LimitGroup,
+    check_limit_switches,
+    move_together
 )
\ No newline at end of file
@@ -0,0 +1,4 @@
+# Manifest to freeze the driver into a MicroPython firmware image as precompiled bytecode:
+#   make -C ports/rp2 BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/DVR8825_Driver/manifest.py
+include('$(PORT_DIR)/boards/manifest.py')
+module('DVR8825_Driver.py', opt=3)